@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import numpy as np
@@ -96,29 +95,362 @@ COLORS = {
     'text': '#2c3e50'
 }
 
+# Columns used across statistics, rankings and correlation views
+SCORE_COLUMNS = ['総合スコア', '環境スコア', '社会スコア', 'ガバナンススコア']
+FINANCIAL_METRICS = {
+    "PER（TTM）": "PE Ratio (TTM)",
+    "PBR": "Price/Book",
+    "EV/EBITDA": "Enterprise Value/EBITDA"
+}
+
+# Above this row count the scatter switches to a density raster with only
+# the top companies labelled; per-point text rendering dominates otherwise.
+SCATTER_POINT_LIMIT = 2000
+
+# Rows shipped to the browser per data-table page
+TABLE_PAGE_SIZE = 100
+
 # Load data
 @st.cache_data
 def load_data():
-    df = pd.read_csv('data.csv')
+    # Keep a Parquet copy next to the CSV: columnar binary reads skip the
+    # text tokenization/decoding that dominates repeated CSV loads.
+    parquet_path = 'data.parquet'
+    if not os.path.exists(parquet_path):
+        df = pd.read_csv('data.csv')
+        df.to_parquet(parquet_path, engine='pyarrow', compression='zstd')
+    df = pd.read_parquet(parquet_path, engine='pyarrow', dtype_backend='pyarrow')
+    # float32 is plenty for display: halves memory and the JSON payload
+    # shipped to the browser. Company names are dictionary-encoded.
+    numeric_cols = SCORE_COLUMNS + list(FINANCIAL_METRICS.values())
+    df[numeric_cols] = df[numeric_cols].astype('float32[pyarrow]')
+    df['会社名'] = df['会社名'].astype('category')
     return df
 
+# Shared chart styling lives in one Template so per-figure layouts (and
+# their JSON payloads) carry only what differs between the two charts.
+CHART_TEMPLATE = go.layout.Template(
+    layout=go.Layout(
+        font=dict(family="Arial, sans-serif", color=COLORS['text']),
+        plot_bgcolor=COLORS['background'],
+        paper_bgcolor='white',
+        xaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)'),
+        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)')
+    )
+)
+
+# Static figure layouts, built once per process; figures copy them on
+# construction, so per-rerun code only touches the axis titles.
+@st.cache_resource
+def base_ranking_layout():
+    return go.Layout(
+        template=CHART_TEMPLATE,
+        height=400,
+        margin=dict(l=0, r=0, t=20, b=0),
+        xaxis=dict(gridwidth=1),
+        yaxis=dict(showgrid=False)
+    )
+
+@st.cache_resource
+def base_scatter_layout():
+    return go.Layout(
+        template=CHART_TEMPLATE,
+        height=400,
+        margin=dict(l=0, r=0, t=40, b=0)
+    )
+
+def top_k_indices(values, k):
+    # Indices of the k largest values in ascending order: an O(N)
+    # argpartition plus a partial sort of only the selected rows, instead
+    # of sorting the whole column.
+    k = min(k, values.size)
+    idx = np.argpartition(values, -k)[-k:] if k < values.size else np.arange(values.size)
+    return idx[np.argsort(values[idx])]
+
+@st.cache_data
+def precompute_views(df):
+    # Rankings, correlations and trend-line fits only depend on the data,
+    # not on widget state, so compute them once for every score/financial
+    # combination and let reruns look the results up.
+    views = {'top15': {}, 'pairs': {}}
+    names = df['会社名'].to_numpy()
+    financial_cols = list(FINANCIAL_METRICS.values())
+    S = df[SCORE_COLUMNS].to_numpy(dtype=np.float64)
+    F = df[financial_cols].to_numpy(dtype=np.float64)
+
+    # All 4x3 correlations and closed-form line fits from one centered
+    # matrix product instead of a pairwise corr + fit per combination.
+    Sc = S - S.mean(axis=0)
+    Fc = F - F.mean(axis=0)
+    cov = Sc.T @ Fc
+    ss_s = (Sc * Sc).sum(axis=0)
+    ss_f = (Fc * Fc).sum(axis=0)
+    corr = cov / np.sqrt(np.outer(ss_s, ss_f))
+    slopes = cov / ss_s[:, None]
+    intercepts = F.mean(axis=0)[None, :] - slopes * S.mean(axis=0)[:, None]
+
+    for i, score_col in enumerate(SCORE_COLUMNS):
+        x = S[:, i]
+        # Top-15 stored as plain arrays ready for go.Bar
+        idx = top_k_indices(x, 15)
+        views['top15'][score_col] = {'values': x[idx], 'names': names[idx]}
+        x_endpoints = np.array([x.min(), x.max()])
+        for j, financial_col in enumerate(financial_cols):
+            views['pairs'][(score_col, financial_col)] = {
+                'corr': corr[i, j],
+                'x_endpoints': x_endpoints,
+                'y_endpoints': slopes[i, j] * x_endpoints + intercepts[i, j],
+            }
+    return views
+
+@st.cache_data
+def lower_names(df):
+    # Prebuilt lowercase name array so the search filter is a single
+    # C-level substring scan instead of a per-row regex match.
+    return df['会社名'].str.lower().to_numpy(dtype=np.str_)
+
+@st.cache_data
+def load_logo(path, mtime):
+    # Cache the raw PNG bytes so reruns skip the disk read and re-encode;
+    # mtime is part of the cache key so a replaced file is picked up.
+    with open(path, 'rb') as f:
+        return f.read()
+
+@st.cache_data
+def df_to_csv_bytes(df):
+    # CSV serialization is Python-level per row; cache the bytes so reruns
+    # with an unchanged filter skip it entirely.
+    return df.to_csv(index=False).encode('utf-8-sig')
+
 @st.cache_data
 def calculate_statistics(df):
+    # One agg call and one argpartition pass over all score columns instead
+    # of separate mean/median/nlargest calls per column.
     stats = {}
-    score_columns = ['総合スコア', '環境スコア', '社会スコア', 'ガバナンススコア']
-    
-    for col in score_columns:
-        stats[f'{col}_avg'] = df[col].mean()
-        stats[f'{col}_median'] = df[col].median()
-        stats[f'{col}_top'] = df.nlargest(3, col)['会社名'].tolist()
-    
+    agg_df = df[SCORE_COLUMNS].agg(['mean', 'median'])
+    scores = df[SCORE_COLUMNS].to_numpy()
+    names = df['会社名'].to_numpy()
+    top3 = np.argpartition(scores, -3, axis=0)[-3:]
+
+    for i, col in enumerate(SCORE_COLUMNS):
+        stats[f'{col}_avg'] = agg_df.loc['mean', col]
+        stats[f'{col}_median'] = agg_df.loc['median', col]
+        idx = top3[:, i]
+        idx = idx[np.argsort(scores[idx, i])[::-1]]
+        stats[f'{col}_top'] = names[idx].tolist()
+
     return stats
 
+# Each tab is an isolated rerun scope: widget changes inside a fragment
+# only re-execute that fragment, not the whole script.
+@st.fragment
+def render_analysis_tab(df, views):
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.subheader("ESGスコアランキング")
+        selected_score_ranking = st.selectbox(
+            "スコアの種類を選択",
+            options=SCORE_COLUMNS,
+            key="ranking_score"
+        )
+
+        # Ranking visualization (precomputed top 15, ascending for the bar chart)
+        top15 = views['top15'][selected_score_ranking]
+
+        # Raw trace dicts skip the per-property validators that dominate
+        # figure construction time
+        fig_ranking = go.Figure(
+            data=[{
+                'type': 'bar',
+                'x': top15['values'],
+                'y': top15['names'],
+                'orientation': 'h',
+                'marker': {'color': COLORS['primary']}
+            }],
+            layout=base_ranking_layout(),
+            skip_invalid=True
+        )
+        fig_ranking.layout.xaxis.title = selected_score_ranking
+
+        st.plotly_chart(fig_ranking, use_container_width=True)
+
+    with col2:
+        st.subheader("財務指標との相関")
+        metric_col1, metric_col2 = st.columns(2)
+
+        with metric_col1:
+            selected_score_scatter = st.selectbox(
+                "ESGスコア",
+                options=SCORE_COLUMNS,
+                key="scatter_score"
+            )
+
+        with metric_col2:
+            selected_financial_display = st.selectbox(
+                "財務指標",
+                options=list(FINANCIAL_METRICS.keys()),
+                key="financial_metric"
+            )
+            selected_financial = FINANCIAL_METRICS[selected_financial_display]
+
+        # Precomputed correlation and trend-line fit for this pair
+        pair = views['pairs'][(selected_score_scatter, selected_financial)]
+        correlation = pair['corr']
+
+        # Hoist the plotted columns into local NumPy views once instead of
+        # repeating the pandas column lookups per trace
+        x = df[selected_score_scatter].to_numpy()
+        y = df[selected_financial].to_numpy()
+        names = df['会社名'].to_numpy()
+
+        # Scatter traces as raw dicts; beyond SCATTER_POINT_LIMIT rows,
+        # aggregate into a density raster and only label the
+        # highest-scoring companies
+        if len(df) > SCATTER_POINT_LIMIT:
+            outliers = df.nlargest(20, selected_score_scatter)
+            # Bin server-side so the browser receives the fixed-size grid,
+            # not the raw O(N) point arrays
+            counts, x_edges, y_edges = np.histogram2d(x, y, bins=(60, 40))
+            traces = [
+                {
+                    'type': 'heatmap',
+                    'z': counts.T,
+                    'x': (x_edges[:-1] + x_edges[1:]) / 2,
+                    'y': (y_edges[:-1] + y_edges[1:]) / 2,
+                    'colorscale': 'Blues',
+                    'showscale': False
+                },
+                {
+                    'type': 'scatter',
+                    'mode': 'markers+text',
+                    'x': outliers[selected_score_scatter],
+                    'y': outliers[selected_financial],
+                    'text': outliers['会社名'],
+                    'textposition': 'top center',
+                    'marker': {'size': 10, 'color': COLORS['secondary']},
+                    'showlegend': False
+                },
+            ]
+        else:
+            traces = [{
+                'type': 'scatter',
+                'mode': 'markers+text',
+                'x': x,
+                'y': y,
+                'text': names,
+                'textposition': 'top center',
+                'marker': {'size': 10, 'color': COLORS['secondary']},
+                'showlegend': False
+            }]
+
+        # Trend line: a straight line only needs its two endpoints
+        traces.append({
+            'type': 'scatter',
+            'mode': 'lines',
+            'x': pair['x_endpoints'],
+            'y': pair['y_endpoints'],
+            'name': 'トレンド',
+            'line': {'color': 'red', 'dash': 'dash'}
+        })
+
+        fig_scatter = go.Figure(
+            data=traces,
+            layout=base_scatter_layout(),
+            skip_invalid=True
+        )
+        fig_scatter.layout.title = f"相関係数: {correlation:.2f}"
+        fig_scatter.layout.xaxis.title = selected_score_scatter
+        fig_scatter.layout.yaxis.title = selected_financial_display
+
+        st.plotly_chart(fig_scatter, use_container_width=True)
+
+@st.fragment
+def render_table_tab(df):
+    st.subheader("データテーブル")
+
+    # Search functionality: a form batches typing into one rerun on
+    # submit instead of a full rerun per keystroke
+    with st.form("search_form", border=False):
+        search = st.text_input("企業名で検索", "")
+        st.form_submit_button("検索")
+
+    # Filter data based on search (vectorized substring scan, no regex)
+    if search:
+        mask = np.char.find(lower_names(df), search.lower()) >= 0
+        filtered_df = df[mask]
+    else:
+        filtered_df = df
+
+    # Paginate: only one page of rows is serialized and rendered; the
+    # download below still covers the whole filtered set
+    total = len(filtered_df)
+    if total > TABLE_PAGE_SIZE:
+        pages = -(-total // TABLE_PAGE_SIZE)
+        page = st.number_input("ページ", min_value=1, max_value=pages, value=1, step=1)
+        start = (page - 1) * TABLE_PAGE_SIZE
+        page_df = filtered_df.iloc[start:start + TABLE_PAGE_SIZE]
+        st.caption(f"{total}件中 {start + 1}〜{min(start + TABLE_PAGE_SIZE, total)}件を表示")
+    else:
+        page_df = filtered_df
+
+    # Display sortable table
+    st.dataframe(
+        page_df,
+        hide_index=True,
+        column_config={
+            "会社名": "企業名",
+            "総合スコア": st.column_config.NumberColumn("総合スコア", format="%.1f"),
+            "環境スコア": st.column_config.NumberColumn("環境スコア", format="%.1f"),
+            "社会スコア": st.column_config.NumberColumn("社会スコア", format="%.1f"),
+            "ガバナンススコア": st.column_config.NumberColumn("ガバナンススコア", format="%.1f"),
+            "PE Ratio (TTM)": st.column_config.NumberColumn("PER（TTM）", format="%.1f"),
+            "Price/Book": st.column_config.NumberColumn("PBR", format="%.2f"),
+            "Enterprise Value/EBITDA": st.column_config.NumberColumn("EV/EBITDA", format="%.1f")
+        }
+    )
+
+    # Download button
+    st.download_button(
+        "CSVをダウンロード",
+        df_to_csv_bytes(filtered_df),
+        "esg_data.csv",
+        "text/csv",
+        key='download-csv'
+    )
+
+@st.fragment
+def render_info_tab():
+    st.subheader("データについて")
+    st.markdown("""
+    ### 指標の説明
+
+    #### ESGスコア
+    - **総合スコア**: 環境、社会、ガバナンスの総合評価
+    - **環境スコア**: 環境への取り組みの評価
+    - **社会スコア**: 社会的責任の評価
+    - **ガバナンススコア**: 企業統治の評価
+
+    #### 財務指標
+    - **PER（TTM）**: 株価収益率（12ヶ月）
+    - **PBR**: 株価純資産倍率
+    - **EV/EBITDA**: 企業価値収益率
+
+    ### 更新頻度
+    データは四半期ごとに更新されます。
+
+    ### データソース
+    - ESGデータ: 各社のウェブサイトに公開されている情報に基づく
+    - 財務データ: Yahoo Finance
+    - ESGスコア: 自社独自の方法論で算出
+    """)
+
 def main():
     # Load data
     try:
         df = load_data()
         stats = calculate_statistics(df)
+        views = precompute_views(df)
     except FileNotFoundError:
         st.error("エラー：data.csvファイルが見つかりません。")
         return
@@ -129,225 +461,40 @@ def main():
         
         with col1:
             if os.path.exists("logo.png"):
-                st.image("logo.png", use_container_width=True)
+                logo = load_logo("logo.png", os.path.getmtime("logo.png"))
+                st.image(logo, use_container_width=True)
             else:
                 st.info("ロゴを表示するには、'logo.png'をアプリケーションのディレクトリに配置してください。")
         
         with col2:
             st.title("JESGO エバリュエーター | 比較機能デモ")
 
-    # Overview metrics
+    # Overview metrics: one markdown element for the whole card strip,
+    # i.e. one protocol message instead of four columns x four markdowns
     st.markdown("### 主要指標")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>総合スコア平均</h3>
-            <div class="metric-value">{:.1f}</div>
-        </div>
-        """.format(stats['総合スコア_avg']), unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>環境スコア平均</h3>
-            <div class="metric-value">{:.1f}</div>
-        </div>
-        """.format(stats['環境スコア_avg']), unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>社会スコア平均</h3>
-            <div class="metric-value">{:.1f}</div>
-        </div>
-        """.format(stats['社会スコア_avg']), unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>ガバナンススコア平均</h3>
-            <div class="metric-value">{:.1f}</div>
-        </div>
-        """.format(stats['ガバナンススコア_avg']), unsafe_allow_html=True)
+    cards = "".join(
+        '<div class="metric-card" style="flex: 1">'
+        f'<h3>{col}平均</h3>'
+        f'<div class="metric-value">{stats[f"{col}_avg"]:.1f}</div>'
+        '</div>'
+        for col in SCORE_COLUMNS
+    )
+    st.markdown(
+        f'<div style="display: flex; gap: 1rem">{cards}</div>',
+        unsafe_allow_html=True
+    )
 
     # Main content tabs
     tab1, tab2, tab3 = st.tabs(["📊 分析", "📋 データテーブル", "ℹ️ 情報"])
-    
+
     with tab1:
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.subheader("ESGスコアランキング")
-            score_options = {
-                "総合スコア": "総合スコア",
-                "環境スコア": "環境スコア",
-                "社会スコア": "社会スコア",
-                "ガバナンススコア": "ガバナンススコア"
-            }
-            selected_score_ranking = st.selectbox(
-                "スコアの種類を選択",
-                options=list(score_options.keys()),
-                key="ranking_score"
-            )
-            
-            # Ranking visualization
-            sorted_data = df.sort_values(by=selected_score_ranking, ascending=True).tail(15)
-            
-            fig_ranking = go.Figure()
-            fig_ranking.add_trace(go.Bar(
-                x=sorted_data[selected_score_ranking],
-                y=sorted_data['会社名'],
-                orientation='h',
-                marker_color=COLORS['primary']
-            ))
-            
-            fig_ranking.update_layout(
-                height=400,
-                margin=dict(l=0, r=0, t=20, b=0),
-                xaxis_title=selected_score_ranking,
-                yaxis_title=None,
-                plot_bgcolor=COLORS['background'],
-                paper_bgcolor='white',
-                font=dict(family="Arial, sans-serif", color=COLORS['text']),
-                xaxis=dict(showgrid=True, gridwidth=1, gridcolor='rgba(0,0,0,0.1)'),
-                yaxis=dict(showgrid=False)
-            )
-            
-            st.plotly_chart(fig_ranking, use_container_width=True)
-        
-        with col2:
-            st.subheader("財務指標との相関")
-            metric_col1, metric_col2 = st.columns(2)
-            
-            with metric_col1:
-                selected_score_scatter = st.selectbox(
-                    "ESGスコア",
-                    options=list(score_options.keys()),
-                    key="scatter_score"
-                )
-            
-            with metric_col2:
-                financial_metrics = {
-                    "PER（TTM）": "PE Ratio (TTM)",
-                    "PBR": "Price/Book",
-                    "EV/EBITDA": "Enterprise Value/EBITDA"
-                }
-                selected_financial_display = st.selectbox(
-                    "財務指標",
-                    options=list(financial_metrics.keys()),
-                    key="financial_metric"
-                )
-                selected_financial = financial_metrics[selected_financial_display]
-            
-            # Calculate correlation
-            correlation = df[score_options[selected_score_scatter]].corr(df[selected_financial])
-            
-            # Scatter plot
-            fig_scatter = px.scatter(
-                df,
-                x=score_options[selected_score_scatter],
-                y=selected_financial,
-                text='会社名',
-                title=f"相関係数: {correlation:.2f}"
-            )
-            
-            # Add trend line
-            fig_scatter.add_trace(
-                go.Scatter(
-                    x=df[score_options[selected_score_scatter]],
-                    y=np.poly1d(np.polyfit(df[score_options[selected_score_scatter]], df[selected_financial], 1))(df[score_options[selected_score_scatter]]),
-                    mode='lines',
-                    name='トレンド',
-                    line=dict(color='red', dash='dash')
-                )
-            )
-            
-            fig_scatter.update_traces(
-                textposition='top center',
-                marker=dict(size=10, color=COLORS['secondary'])
-            )
-            
-            fig_scatter.update_layout(
-                height=400,
-                plot_bgcolor=COLORS['background'],
-                paper_bgcolor='white',
-                margin=dict(l=0, r=0, t=40, b=0),
-                font=dict(family="Arial, sans-serif", color=COLORS['text']),
-                xaxis=dict(
-                    title=selected_score_scatter,
-                    showgrid=True,
-                    gridcolor='rgba(0,0,0,0.1)'
-                ),
-                yaxis=dict(
-                    title=selected_financial_display,
-                    showgrid=True,
-                    gridcolor='rgba(0,0,0,0.1)'
-                )
-            )
-            
-            st.plotly_chart(fig_scatter, use_container_width=True)
+        render_analysis_tab(df, views)
 
     with tab2:
-        st.subheader("データテーブル")
-        
-        # Search functionality
-        search = st.text_input("企業名で検索", "")
-        
-        # Filter data based on search
-        filtered_df = df[df['会社名'].str.contains(search, case=False)] if search else df
-        
-        # Display sortable table
-        st.dataframe(
-            filtered_df,
-            hide_index=True,
-            column_config={
-                "会社名": "企業名",
-                "総合スコア": st.column_config.NumberColumn("総合スコア", format="%.1f"),
-                "環境スコア": st.column_config.NumberColumn("環境スコア", format="%.1f"),
-                "社会スコア": st.column_config.NumberColumn("社会スコア", format="%.1f"),
-                "ガバナンススコア": st.column_config.NumberColumn("ガバナンススコア", format="%.1f"),
-                "PE Ratio (TTM)": st.column_config.NumberColumn("PER（TTM）", format="%.1f"),
-                "Price/Book": st.column_config.NumberColumn("PBR", format="%.2f"),
-                "Enterprise Value/EBITDA": st.column_config.NumberColumn("EV/EBITDA", format="%.1f")
-            }
-        )
-        
-        # Download button
-        csv = filtered_df.to_csv(index=False).encode('utf-8-sig')
-        st.download_button(
-            "CSVをダウンロード",
-            csv,
-            "esg_data.csv",
-            "text/csv",
-            key='download-csv'
-        )
+        render_table_tab(df)
 
     with tab3:
-        st.subheader("データについて")
-        st.markdown("""
-        ### 指標の説明
-        
-        #### ESGスコア
-        - **総合スコア**: 環境、社会、ガバナンスの総合評価
-        - **環境スコア**: 環境への取り組みの評価
-        - **社会スコア**: 社会的責任の評価
-        - **ガバナンススコア**: 企業統治の評価
-        
-        #### 財務指標
-        - **PER（TTM）**: 株価収益率（12ヶ月）
-        - **PBR**: 株価純資産倍率
-        - **EV/EBITDA**: 企業価値収益率
-        
-        ### 更新頻度
-        データは四半期ごとに更新されます。
-        
-        ### データソース
-        - ESGデータ: 各社のウェブサイトに公開されている情報に基づく
-        - 財務データ: Yahoo Finance
-        - ESGスコア: 自社独自の方法論で算出
-        """)
+        render_info_tab()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file